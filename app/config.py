@@ -1,24 +1,65 @@
+import functools
 import os
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
 
-load_dotenv()
 
+@functools.cache
+def load_env() -> None:
+    """
+    Charge le fichier .env une seule fois par processus.
+
+    Le drapeau OPENFLIP_ENV_LOADED survit a un rechargement du module
+    (tests, reload), ce que le cache de la fonction seul ne couvre pas.
+    """
+    if not os.getenv("OPENFLIP_ENV_LOADED"):
+        load_dotenv()
+        os.environ["OPENFLIP_ENV_LOADED"] = "1"
+
+
+load_env()
+
+
+@dataclass(frozen=True, slots=True)
 class Settings:
+    """Configuration lue une seule fois depuis l'environnement a l'import"""
+
     APP_NAME: str = "OpenFlip"
     APP_URL: str = os.getenv("APP_URL", "http://localhost:8000")
     MAX_FILE_SIZE: int = int(os.getenv("MAX_FILE_SIZE", 50 * 1024 * 1024))
-    
+    MAX_FILE_SIZE_MB: int = MAX_FILE_SIZE // (1024 * 1024)
+
+    # Base de donnees: PostgreSQL si defini, sinon SQLite local
+    DATABASE_URL: Optional[str] = os.getenv("DATABASE_URL")
+
+    # Pool de connexions (PostgreSQL uniquement)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 20))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 30))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800))
+
+    # Processus de rendu PDF par worker uvicorn. Par defaut, les CPU sont
+    # repartis entre les workers (WEB_CONCURRENCY, lu aussi par uvicorn)
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", 1))
+    RENDER_WORKERS: int = int(os.getenv("OPENFLIP_WORKERS", max(1, (os.cpu_count() or 4) // WEB_CONCURRENCY)))
+
+    # Resolution de rendu des pages: le nombre de pixels (memoire, temps
+    # d'encodage, taille des fichiers) croit avec le carre de la valeur
+    RENDER_DPI: int = int(os.getenv("RENDER_DPI", 110))
+
+    # Pages servies par nginx (X-Accel-Redirect) plutot que par Python.
+    # Necessite un bloc nginx du type:
+    #   location /internal/pages/ { internal; alias <STORAGE_DIR>/pages/; }
+    USE_X_ACCEL: bool = os.getenv("USE_X_ACCEL", "").lower() in ("1", "true", "yes")
+    X_ACCEL_PAGES_PREFIX: str = os.getenv("X_ACCEL_PAGES_PREFIX", "/internal/pages")
+
     BASE_DIR: Path = Path(__file__).parent.parent
     STATIC_DIR: Path = BASE_DIR / "static"
     STORAGE_DIR: Path = BASE_DIR / "storage"
     UPLOAD_DIR: Path = STORAGE_DIR / "uploads"
     PAGES_DIR: Path = STORAGE_DIR / "pages"
     IMAGES_DIR: Path = STORAGE_DIR / "images"
-    
-    def __init__(self):
-        self.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-        self.PAGES_DIR.mkdir(parents=True, exist_ok=True)
-        self.IMAGES_DIR.mkdir(parents=True, exist_ok=True)
 
 settings = Settings()
@@ -1,116 +1,221 @@
-from sqlmodel import SQLModel, create_engine, Session
-from contextlib import contextmanager
-from typing import Generator
-import os
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event, inspect, text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+import functools
 
 from .config import settings
+# Import des modeles pour que SQLModel les connaisse
+from .models import Flipbook, Page, Widget  # noqa: F401
 
 # ============================================================================
 # CONFIGURATION DATABASE
 # ============================================================================
 
-# Détection automatique du mode Production vs Local
-database_url = os.getenv("DATABASE_URL")
-
-if database_url:
-    # Mode Production : utilise PostgreSQL via la variable DATABASE_URL
-    # Correction critique pour SQLAlchemy >= 2.0 : 
-    # Render fournit postgres://, mais SQLAlchemy requiert postgresql://
-    database_url = database_url.replace("postgres://", "postgresql://")
-    DATABASE_URL = database_url
-else:
-    # Mode Local : utilise SQLite
-    DATABASE_URL = f"sqlite:///{settings.STORAGE_DIR}/openflip.db"
-
-# Déterminer les arguments de connexion selon la base de données
-if database_url and "postgresql://" in DATABASE_URL:
-    # PostgreSQL
-    connect_args = {}
-    pool_pre_ping = True  # Vérifie la connexion avant chaque requête
-else:
-    # SQLite
-    connect_args = {
-        "check_same_thread": False,  # Permet l'acces multi-thread pour FastAPI
-        "timeout": 30  # Timeout de 30 secondes pour les locks
-    }
-    pool_pre_ping = False
-
-engine = create_engine(
-    DATABASE_URL,
-    echo=False,
-    connect_args=connect_args,
-    pool_pre_ping=pool_pre_ping
-)
+# Arguments de connexion SQLite (aiosqlite)
+SQLITE_CONNECT_ARGS = {
+    "timeout": 30  # Timeout de 30 secondes pour les locks
+}
+
+# Taille du cache de compilation SQL (defaut SQLAlchemy: 500): les variantes
+# de requetes (IN de tailles differentes, options de chargement) s'y accumulent
+QUERY_CACHE_SIZE = 1200
+
+
+def _set_sqlite_pragmas(dbapi_conn, _connection_record):
+    """
+    Applique les PRAGMA SQLite a chaque nouvelle connexion:
+    WAL (lectures concurrentes pendant une ecriture), fsync allege,
+    lectures via mmap et tables temporaires en memoire.
+    """
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")  # Sur en mode WAL
+    cursor.execute("PRAGMA wal_autocheckpoint=1000")  # Checkpoint toutes les 1000 pages de WAL
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-65536")  # 64 MB
+    cursor.execute("PRAGMA busy_timeout=30000")  # Aligne sur SQLITE_CONNECT_ARGS["timeout"]
+    cursor.close()
+
+
+@functools.cache
+def _build_engine() -> AsyncEngine:
+    """
+    Construit l'engine asynchrone selon la configuration (une seule fois par processus).
+
+    Detection automatique du mode Production vs Local:
+    - DATABASE_URL defini: PostgreSQL (psycopg 3) avec un pool LIFO dimensionne
+    - sinon: SQLite local (aiosqlite) avec un pool de connexions persistantes
+    """
+    if settings.DATABASE_URL:
+        # Render fournit postgres://, SQLAlchemy requiert un nom de driver explicite
+        database_url = (
+            settings.DATABASE_URL
+            .replace("postgres://", "postgresql://", 1)
+            .replace("postgresql://", "postgresql+psycopg://", 1)
+        )
+    else:
+        database_url = f"sqlite+aiosqlite:///{settings.STORAGE_DIR}/openflip.db"
+
+    if database_url.startswith("postgresql"):
+        return create_async_engine(
+            database_url,
+            echo=False,
+            pool_pre_ping=True,  # Vérifie la connexion avant chaque requête
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,  # Recycle avant les coupures cote serveur
+            pool_use_lifo=True,  # Reutilise les connexions chaudes, laisse expirer les autres
+            query_cache_size=QUERY_CACHE_SIZE,
+        )
+
+    # Pool explicite: les connexions (et leurs PRAGMA) sont reutilisees entre
+    # requetes, quel que soit le pool par defaut de la version de SQLAlchemy
+    sqlite_engine = create_async_engine(
+        database_url,
+        echo=False,
+        connect_args=SQLITE_CONNECT_ARGS,
+        poolclass=AsyncAdaptedQueuePool,
+        query_cache_size=QUERY_CACHE_SIZE
+    )
+    event.listen(sqlite_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return sqlite_engine
+
+
+engine = _build_engine()
+
+# Fabrique de sessions: les objets restent lisibles apres commit sans
+# rechargement implicite (impossible hors contexte async)
+AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
 # ============================================================================
 # INITIALISATION
 # ============================================================================
 
-def init_db():
+async def init_db():
     """
     Cree toutes les tables si elles n'existent pas.
     Appele au demarrage de l'application.
-    """
-    # Import des modeles pour que SQLModel les connaisse
-    from .models import Flipbook, Page, Widget  # noqa: F401
 
+    Chaque etape de migration s'execute dans sa propre transaction: l'echec
+    de l'une (ex: index unique sur des donnees en double) n'annule pas les
+    autres, notamment le remplissage des colonnes ajoutees.
+    """
     try:
-        SQLModel.metadata.create_all(engine, checkfirst=True)
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all, checkfirst=True)
     except Exception as e:
         # Si la table existe mais avec un schéma différent, on ignore l'erreur
         # C'est une situation de migration qui nécessite un script SQL manuel
         print(f"Warning: Database schema issue: {e}")
         print("If you need to update the schema, you may need to delete the database and recreate it.")
 
+    await _run_migration_step(_add_missing_columns, "missing columns")
+
+    # Un index par transaction: un index impossible a creer n'empeche pas les autres
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            await _run_migration_step(
+                functools.partial(index.create, checkfirst=True),
+                f"index {index.name}"
+            )
+
+
+async def _run_migration_step(step, description: str) -> None:
+    """
+    Execute une etape de migration synchrone dans sa propre transaction.
+    Un echec est signale sans interrompre le demarrage.
+
+    Args:
+        step: Fonction recevant la connexion synchrone
+        description: Libelle de l'etape pour le message d'avertissement
+    """
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(step)
+    except Exception as e:
+        print(f"Warning: Database migration failed ({description}): {e}")
+
 
-def drop_db():
+def _add_missing_columns(conn):
+    """
+    Ajoute les colonnes introduites apres la creation initiale des tables.
+    create_all() ne modifie pas une table qui existe deja.
+    """
+    flipbook_columns = {c["name"] for c in inspect(conn).get_columns("flipbook")}
+
+    if "page_count" not in flipbook_columns:
+        conn.execute(text("ALTER TABLE flipbook ADD COLUMN page_count INTEGER NOT NULL DEFAULT 0"))
+        conn.execute(text(
+            "UPDATE flipbook SET page_count = "
+            "(SELECT COUNT(*) FROM page WHERE page.flipbook_id = flipbook.id)"
+        ))
+
+
+async def drop_db():
     """
     Supprime toutes les tables (utile pour les tests).
     ATTENTION: Perte de donnees!
     """
-    SQLModel.metadata.drop_all(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
 
 
 # ============================================================================
 # SESSIONS
 # ============================================================================
 
-def get_session() -> Generator[Session, None, None]:
+async def get_session() -> AsyncGenerator[AsyncSession, None]:
     """
     Generateur de session pour les dependances FastAPI.
 
     Usage:
         @router.get("/api/example")
-        async def example(session: Session = Depends(get_session)):
+        async def example(session: AsyncSession = Depends(get_session)):
             ...
     """
-    with Session(engine) as session:
+    async with AsyncSessionLocal() as session:
         try:
             yield session
         except Exception:
-            session.rollback()
+            await session.rollback()
             raise
 
 
-@contextmanager
-def get_session_context() -> Generator[Session, None, None]:
+async def get_readonly_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Generateur de session pour les routes en lecture seule (GET).
+
+    La connexion est en autocommit: les SELECT ne sont pas encadres par
+    un BEGIN/ROLLBACK implicite. Ne pas utiliser pour des ecritures.
+    """
+    async with AsyncSessionLocal() as session:
+        await session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+        yield session
+
+
+@asynccontextmanager
+async def get_session_context() -> AsyncGenerator[AsyncSession, None]:
     """
     Context manager pour utilisation hors FastAPI.
 
     Usage:
-        with get_session_context() as session:
-            flipbook = session.get(Flipbook, "abc123")
+        async with get_session_context() as session:
+            flipbook = await session.get(Flipbook, "abc123")
     """
-    session = Session(engine)
-    try:
-        yield session
-        session.commit()
-    except Exception:
-        session.rollback()
-        raise
-    finally:
-        session.close()
+    async with AsyncSessionLocal() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
 
 
 # ============================================================================
@@ -119,16 +224,16 @@ def get_session_context() -> Generator[Session, None, None]:
 
 def execute_with_session(func):
     """
-    Decorateur pour executer une fonction avec une session.
+    Decorateur pour executer une coroutine avec une session.
 
     Usage:
         @execute_with_session
-        def create_flipbook(session: Session, title: str):
+        async def create_flipbook(session: AsyncSession, title: str):
             flipbook = Flipbook(title=title)
             session.add(flipbook)
             return flipbook
     """
-    def wrapper(*args, **kwargs):
-        with get_session_context() as session:
-            return func(session, *args, **kwargs)
+    async def wrapper(*args, **kwargs):
+        async with get_session_context() as session:
+            return await func(session, *args, **kwargs)
     return wrapper
@@ -1,25 +1,43 @@
 import mimetypes
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from .config import settings
-from .routes import router
-from .database import init_db
+from .routes import router, PAGE_CACHE_CONTROL
+from .database import engine, init_db
+from .services import shutdown_pools
 
 mimetypes.add_type("image/webp", ".webp")
 
 
+class PageStaticFiles(StaticFiles):
+    """StaticFiles avec mise en cache longue duree des images de pages"""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = PAGE_CACHE_CONTROL
+        return response
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialise la base de données au démarrage"""
-    init_db()
+    """Cree les repertoires de stockage et initialise la base de données au démarrage"""
+    settings.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    settings.PAGES_DIR.mkdir(parents=True, exist_ok=True)
+    settings.IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+    await init_db()
     yield
+    await engine.dispose()
+    shutdown_pools()
 
 
-app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
+# orjson pour toutes les reponses JSON (datetime serialises nativement)
+app = FastAPI(title=settings.APP_NAME, lifespan=lifespan, default_response_class=ORJSONResponse)
 
+# Les repertoires de stockage sont crees par lifespan(), apres le montage
 app.mount("/static", StaticFiles(directory=settings.STATIC_DIR), name="static")
-app.mount("/pages", StaticFiles(directory=settings.PAGES_DIR), name="pages")
-app.mount("/storage/images", StaticFiles(directory=settings.STORAGE_DIR / "images"), name="images")
+app.mount("/pages", PageStaticFiles(directory=settings.PAGES_DIR, check_dir=False), name="pages")
+app.mount("/storage/images", StaticFiles(directory=settings.IMAGES_DIR, check_dir=False), name="images")
 
 app.include_router(router)
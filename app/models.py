@@ -1,21 +1,74 @@
 from datetime import datetime
 from typing import Optional, List
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field as PydanticField
 from sqlmodel import SQLModel, Field, Relationship
-import json
-import uuid
+from sqlalchemy import Index
+import orjson
+import secrets
 
 
 def generate_uuid() -> str:
-    """Genere un UUID court (8 caracteres)"""
-    return str(uuid.uuid4())[:8]
+    """Genere un identifiant court aleatoire (8 caracteres hexadecimaux)"""
+    return secrets.token_hex(4)
 
 
 def generate_share_token() -> str:
     """Genere un token de partage unique"""
-    import secrets
     return secrets.token_urlsafe(24)
 
 
+# Valeur par defaut des colonnes JSON, evite de serialiser un dict vide
+_EMPTY_JSON = "{}"
+
+
+def dump_json(value: dict) -> str:
+    """Serialise un dict pour une colonne JSON texte"""
+    return orjson.dumps(value).decode() if value else _EMPTY_JSON
+
+
+_EMPTY_FRAGMENT = orjson.Fragment(_EMPTY_JSON)
+
+
+def raw_json(raw: str) -> orjson.Fragment:
+    """
+    Enveloppe le texte d'une colonne JSON pour l'inclure tel quel dans une
+    reponse orjson, sans re-serialisation.
+
+    Le texte est tout de meme verifie: une ancienne ligne au JSON invalide
+    rendrait sinon toute la reponse invalide. Comme a la lecture des
+    proprietes, elle est remplacee par un objet vide.
+    """
+    if not raw:
+        return _EMPTY_FRAGMENT
+    try:
+        orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return _EMPTY_FRAGMENT
+    return orjson.Fragment(raw)
+
+
+def _load_json_column(instance: SQLModel, column: str) -> dict:
+    """
+    Decode une colonne JSON texte, memoise sur l'instance.
+
+    Le resultat est reutilise tant que la chaine stockee dans la colonne
+    reste la meme (comparaison par identite), ce qui evite de re-parser
+    a chaque acces pendant une requete.
+    """
+    raw = getattr(instance, column)
+    cache_key = f"_{column}_cache"
+    cached = instance.__dict__.get(cache_key)
+    if cached is not None and cached[0] is raw:
+        return cached[1]
+
+    try:
+        value = orjson.loads(raw) if raw else {}
+    except orjson.JSONDecodeError:
+        value = {}
+    instance.__dict__[cache_key] = (raw, value)
+    return value
+
+
 # ============================================================================
 # TABLE FLIPBOOK
 # ============================================================================
@@ -26,46 +79,31 @@ class Flipbook(SQLModel, table=True):
     id: str = Field(default_factory=generate_uuid, primary_key=True)
     title: str = Field(index=True)
     path_pdf: str = Field(default="")  # Chemin vers le PDF original
-    style_json: str = Field(default="{}")  # Configuration de style (JSON)
+    style_json: str = Field(default=_EMPTY_JSON)  # Configuration de style (JSON)
     share_token: str = Field(default_factory=generate_share_token, index=True)  # Token de partage unique
+    page_count: int = Field(default=0)  # Denormalise: evite de charger les pages pour les compter
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     # Relations
+    # Tri par numero, puis par ID: ordre stable meme si une ancienne base
+    # contient des numeros de page en double
     pages: List["Page"] = Relationship(
         back_populates="flipbook",
-        sa_relationship_kwargs={"cascade": "all, delete-orphan"}
+        sa_relationship_kwargs={"cascade": "all, delete-orphan", "order_by": "[Page.page_num, Page.id]"}
     )
 
-    @property
-    def page_count(self) -> int:
-        return len(self.pages) if self.pages else 0
-
     @property
     def thumbnail(self) -> str:
         return f"/pages/{self.id}/page_1.webp"
 
     @property
     def style(self) -> dict:
-        try:
-            return json.loads(self.style_json) if self.style_json else {}
-        except json.JSONDecodeError:
-            return {}
+        return _load_json_column(self, "style_json")
 
     @style.setter
     def style(self, value: dict):
-        self.style_json = json.dumps(value, ensure_ascii=False)
-
-    def to_dict(self) -> dict:
-        return {
-            "id": self.id,
-            "title": self.title,
-            "pages": self.page_count,
-            "thumbnail": self.thumbnail,
-            "style": self.style,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
-        }
+        self.style_json = dump_json(value)
 
 
 # ============================================================================
@@ -75,29 +113,31 @@ class Flipbook(SQLModel, table=True):
 class Page(SQLModel, table=True):
     """Table des pages avec dimensions"""
 
+    # Recherche d'une page par (flipbook, numero): l'index suffit pour
+    # select(Page.id) et couvre aussi les filtres sur flipbook_id seul
+    __table_args__ = (
+        Index("ix_page_flipbook_id_page_num", "flipbook_id", "page_num", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    flipbook_id: str = Field(foreign_key="flipbook.id", index=True)
-    page_num: int = Field(index=True)
+    flipbook_id: str = Field(foreign_key="flipbook.id")
+    page_num: int
     image_path: str  # Chemin relatif: "{flipbook_id}/page_{num}.webp"
     width: int = Field(default=0)
     height: int = Field(default=0)
 
     # Relations
     flipbook: Optional[Flipbook] = Relationship(back_populates="pages")
+    # Tri par z_index puis par ID: la plupart des widgets ont z_index=0,
+    # sans second critere leur ordre d'affichage varierait d'une requete a l'autre
     widgets: List["Widget"] = Relationship(
         back_populates="page",
-        sa_relationship_kwargs={"cascade": "all, delete-orphan"}
+        sa_relationship_kwargs={"cascade": "all, delete-orphan", "order_by": "[Widget.z_index, Widget.id]"}
     )
 
-    def to_dict(self) -> dict:
-        return {
-            "id": self.id,
-            "page_num": self.page_num,
-            "image_url": f"/pages/{self.image_path}",
-            "width": self.width,
-            "height": self.height,
-            "widgets": [w.to_dict() for w in self.widgets] if self.widgets else []
-        }
+    @property
+    def image_url(self) -> str:
+        return f"/pages/{self.image_path}"
 
 
 # ============================================================================
@@ -123,11 +163,11 @@ class Widget(SQLModel, table=True):
 
     # Proprietes du widget (JSON)
     # Ex: {"url": "https://...", "title": "Mon lien", "target": "_blank"}
-    props_json: str = Field(default="{}")
+    props_json: str = Field(default=_EMPTY_JSON)
 
     # Geometrie/Position (JSON)
     # Ex: {"x": 100, "y": 200, "width": 150, "height": 80, "rotation": 0}
-    geometry_json: str = Field(default="{}")
+    geometry_json: str = Field(default=_EMPTY_JSON)
 
     # Ordre d'affichage (z-index)
     z_index: int = Field(default=0)
@@ -137,45 +177,35 @@ class Widget(SQLModel, table=True):
 
     @property
     def props(self) -> dict:
-        try:
-            return json.loads(self.props_json)
-        except json.JSONDecodeError:
-            return {}
+        return _load_json_column(self, "props_json")
 
     @props.setter
     def props(self, value: dict):
-        self.props_json = json.dumps(value, ensure_ascii=False)
+        self.props_json = dump_json(value)
 
     @property
     def geometry(self) -> dict:
-        try:
-            return json.loads(self.geometry_json)
-        except json.JSONDecodeError:
-            return {}
+        return _load_json_column(self, "geometry_json")
 
     @geometry.setter
     def geometry(self, value: dict):
-        self.geometry_json = json.dumps(value, ensure_ascii=False)
+        self.geometry_json = dump_json(value)
 
-    def to_dict(self) -> dict:
+    @staticmethod
+    def row_from_dict(page_id: int, data: dict) -> dict:
+        """Colonnes d'un widget depuis un dictionnaire (pour un INSERT en masse)"""
         return {
-            "id": self.id,
-            "type": self.type,
-            "props": self.props,
-            "geometry": self.geometry,
-            "z_index": self.z_index
+            "page_id": page_id,
+            "type": data.get("type", "link"),
+            "props_json": dump_json(data.get("props")),
+            "geometry_json": dump_json(data.get("geometry")),
+            "z_index": data.get("z_index", 0)
         }
 
     @classmethod
     def from_dict(cls, page_id: int, data: dict) -> "Widget":
         """Cree un Widget depuis un dictionnaire"""
-        return cls(
-            page_id=page_id,
-            type=data.get("type", "link"),
-            props_json=json.dumps(data.get("props", {}), ensure_ascii=False),
-            geometry_json=json.dumps(data.get("geometry", {}), ensure_ascii=False),
-            z_index=data.get("z_index", 0)
-        )
+        return cls(**cls.row_from_dict(page_id, data))
 
 
 # ============================================================================
@@ -202,11 +232,29 @@ class EditorSaveRequest(SQLModel):
     pages: List[PageUpdate] = []
 
 
-class FlipbookResponse(SQLModel):
+# ============================================================================
+# SCHEMAS DE REPONSE (serialises par pydantic-core depuis les objets ORM)
+# ============================================================================
+
+class WidgetResponse(BaseModel):
+    """Schema de reponse widget"""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    type: str
+    props: dict
+    geometry: dict
+    z_index: int
+
+
+class FlipbookResponse(BaseModel):
     """Schema de reponse flipbook"""
+    model_config = ConfigDict(from_attributes=True)
+
     id: str
     title: str
-    pages: int
+    # Lu depuis Flipbook.page_count (ORM) ou la cle "pages" (dict)
+    pages: int = PydanticField(validation_alias=AliasChoices("page_count", "pages"))
     thumbnail: str
-    created_at: str
-    updated_at: str
+    created_at: datetime
+    updated_at: datetime
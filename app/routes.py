@@ -1,18 +1,156 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
-from fastapi.responses import FileResponse, JSONResponse
-from sqlmodel import Session, select
-from sqlalchemy.orm import selectinload
-from typing import Optional, List
-from datetime import datetime
-import json
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, Form, HTTPException, Depends, Request, Response
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import bindparam, delete, insert, lambda_stmt, update
+from sqlalchemy.orm import raiseload, selectinload
+from typing import AsyncGenerator, Optional, List
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from pathlib import Path
+import asyncio
+import uuid
+
+import orjson
 
 from .config import settings
-from .models import Flipbook, Page, Widget, EditorSaveRequest
-from .database import get_session
+from .models import Flipbook, Page, Widget, EditorSaveRequest, FlipbookResponse, WidgetResponse, dump_json, raw_json
+from .database import AsyncSessionLocal, get_session, get_readonly_session
 from .services import pdf_service, PDFConversionError
 
 router = APIRouter()
 
+# Taille des blocs lus lors de l'upload d'un PDF
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Taille maximale des images uploadees (background, logo)
+MAX_IMAGE_SIZE = 5 * 1024 * 1024
+
+# Les images de pages ne changent jamais une fois generees (ID unique par upload)
+PAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Requetes des routes les plus frequentes, construites une seule fois:
+# lambda_stmt met en cache la construction et la compilation SQL,
+# seules les valeurs des parametres changent d'un appel a l'autre
+_FLIPBOOK_PDF_PATH = lambda_stmt(
+    lambda: select(Flipbook.path_pdf).where(Flipbook.id == bindparam("doc_id"))
+)
+_FLIPBOOK_UPDATED_AT = lambda_stmt(
+    lambda: select(Flipbook.updated_at).where(Flipbook.id == bindparam("doc_id"))
+)
+_PAGE_ID_BY_NUM = lambda_stmt(
+    lambda: select(Page.id).where(
+        Page.flipbook_id == bindparam("doc_id"),
+        Page.page_num == bindparam("page_num")
+    ).order_by(Page.id)
+)
+_PAGE_IDS_BY_NUM = lambda_stmt(
+    lambda: select(Page.page_num, Page.id).where(Page.flipbook_id == bindparam("doc_id"))
+)
+
+# Chemins des pages HTML, calcules une seule fois
+_INDEX_HTML = settings.STATIC_DIR / "index.html"
+_UPLOAD_HTML = settings.STATIC_DIR / "upload.html"
+_READER_HTML = settings.STATIC_DIR / "reader.html"
+_GALLERY_HTML = settings.STATIC_DIR / "gallery.html"
+_EDITOR_HTML = settings.STATIC_DIR / "editor.html"
+
+
+def _file_etag(stat_result) -> str:
+    """ETag faible derive du stat du fichier (aucune lecture du contenu)"""
+    return f'W/"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def _copy_upload(src, dest: Path, max_size: int) -> bool:
+    """Copie synchrone par blocs, voir _write_upload"""
+    written = 0
+    with open(dest, "wb") as out:
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            written += len(chunk)
+            if written > max_size:
+                break
+            out.write(chunk)
+
+    if written > max_size:
+        dest.unlink(missing_ok=True)
+        return False
+    return True
+
+
+async def _write_upload(file: UploadFile, dest: Path, max_size: int) -> bool:
+    """
+    Ecrit un fichier uploade sur disque par blocs, sans bloquer la boucle
+    d'evenements ni charger le fichier entier en memoire.
+
+    Toute la copie se fait dans un seul appel asyncio.to_thread, plutot
+    qu'un aller-retour vers le pool de threads par bloc lu et ecrit.
+
+    Args:
+        file: Fichier recu
+        dest: Chemin de destination
+        max_size: Taille maximale en octets
+
+    Returns:
+        False si la taille maximale est depassee (le fichier partiel est supprime)
+    """
+    return await asyncio.to_thread(_copy_upload, file.file, dest, max_size)
+
+
+def _flipbook_page_ids(doc_id: str):
+    """Sous-requete des IDs de pages d'un flipbook"""
+    return select(Page.id).where(Page.flipbook_id == doc_id)
+
+
+async def _touch_flipbook(session: AsyncSession, doc_id: str) -> None:
+    """Met a jour updated_at du flipbook par un UPDATE direct, sans le charger"""
+    await session.exec(
+        update(Flipbook).where(Flipbook.id == doc_id).values(updated_at=datetime.utcnow())
+    )
+
+
+def _editor_statement(doc_id: str):
+    """
+    Requete de l'editeur: le flipbook avec ses pages et leurs widgets
+    (deja tries par la base: pages par numero, widgets par z_index, puis
+    par ID). Toute autre relation leve une erreur au lieu de declencher
+    un SELECT paresseux.
+    """
+    return (
+        select(Flipbook)
+        .where(Flipbook.id == doc_id)
+        .options(
+            selectinload(Flipbook.pages).selectinload(Page.widgets).raiseload("*"),
+            raiseload("*")
+        )
+    )
+
+
+def _updated_at_etag(updated_at: datetime) -> str:
+    """ETag faible d'un flipbook: change a chaque modification (updated_at)"""
+    return f'W/"{int(updated_at.timestamp() * 1_000_000):x}"'
+
+
+def _document_cache_headers(updated_at: datetime) -> dict:
+    """
+    En-tetes de validation des JSON editeur/reader: le client garde sa copie
+    mais la revalide a chaque fois (no-cache), un 304 suffit si rien n'a change.
+    """
+    return {
+        "ETag": _updated_at_etag(updated_at),
+        "Last-Modified": format_datetime(updated_at.replace(tzinfo=timezone.utc), usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Vrai si l'ETag figure dans l'en-tete If-None-Match du client"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in (
+        tag.strip() for tag in if_none_match.split(",")
+    )
+
 
 # ============================================================================
 # PAGES HTML
@@ -21,47 +159,47 @@ router = APIRouter()
 @router.get("/")
 async def index():
     """Page d'accueil"""
-    return FileResponse(settings.STATIC_DIR / "index.html")
+    return FileResponse(_INDEX_HTML)
 
 
 @router.get("/upload")
 async def upload_page():
     """Page d'upload"""
-    return FileResponse(settings.STATIC_DIR / "upload.html")
+    return FileResponse(_UPLOAD_HTML)
 
 
 @router.get("/reader/{doc_id}")
 async def reader(doc_id: str):
     """Page de lecture du flipbook"""
-    return FileResponse(settings.STATIC_DIR / "reader.html")
+    return FileResponse(_READER_HTML)
 
 
 @router.get("/gallery")
 async def gallery():
     """Page galerie"""
-    return FileResponse(settings.STATIC_DIR / "gallery.html")
+    return FileResponse(_GALLERY_HTML)
 
 
 @router.get("/editor/{doc_id}")
 async def editor_page(doc_id: str):
     """Page editeur"""
-    return FileResponse(settings.STATIC_DIR / "editor.html")
+    return FileResponse(_EDITOR_HTML)
 
 
 # ============================================================================
 # API - UPLOAD
 # ============================================================================
 
-@router.post("/api/upload")
+@router.post("/api/upload", response_model=FlipbookResponse)
 async def upload_pdf(
     file: UploadFile = File(...),
     title: Optional[str] = Form(None),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
     """
     Upload et convertit un PDF en flipbook.
 
-    - Recoit un fichier PDF (max 50MB)
+    - Recoit un fichier PDF (max 50MB), ecrit par blocs sans le charger en memoire
     - Le sauvegarde dans storage/uploads/
     - Convertit chaque page en WebP dans storage/pages/{id}/
     - Cree les entrees en base de donnees
@@ -74,30 +212,31 @@ async def upload_pdf(
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Seuls les fichiers PDF sont acceptes")
 
-    # Lecture du contenu
-    content = await file.read()
-
-    # Validation de la taille
-    if len(content) > settings.MAX_FILE_SIZE:
+    # Ecriture par blocs dans un fichier temporaire, avec arret des que la taille max est depassee
+    tmp_path = settings.UPLOAD_DIR / f"{uuid.uuid4().hex}.part"
+    if not await _write_upload(file, tmp_path, settings.MAX_FILE_SIZE):
         raise HTTPException(
-            status_code=400,
-            detail=f"Fichier trop volumineux (max {settings.MAX_FILE_SIZE // (1024*1024)}MB)"
+            status_code=413,
+            detail=f"Fichier trop volumineux (max {settings.MAX_FILE_SIZE_MB}MB)"
         )
 
     # Traitement du PDF
     try:
         result = await pdf_service.process_pdf(
-            content=content,
+            upload_path=tmp_path,
             filename=file.filename,
             custom_title=title,
             session=session
         )
-        return JSONResponse(result)
+        return result
 
     except PDFConversionError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur de conversion: {str(e)}")
+    finally:
+        # Sans effet si le fichier a deja ete deplace par process_pdf
+        tmp_path.unlink(missing_ok=True)
 
 
 @router.post("/api/upload/image")
@@ -109,13 +248,7 @@ async def upload_image(file: UploadFile = File(...)):
     - Sauvegarde dans storage/images/
     - Retourne l'URL relative
     """
-    import uuid
     import mimetypes
-    from pathlib import Path
-    
-    # Créer le dossier s'il n'existe pas
-    images_dir = settings.STORAGE_DIR / "images"
-    images_dir.mkdir(parents=True, exist_ok=True)
     
     # Validation du type de fichier
     allowed_types = {'image/jpeg', 'image/png', 'image/webp', 'image/gif'}
@@ -125,31 +258,27 @@ async def upload_image(file: UploadFile = File(...)):
             detail=f"Type de fichier non autorisé. Acceptés: JPG, PNG, WebP, GIF"
         )
     
-    # Validation de la taille (max 5MB pour les images)
-    content = await file.read()
-    if len(content) > 5 * 1024 * 1024:
-        raise HTTPException(
-            status_code=400,
-            detail="Image trop volumineux (max 5MB)"
-        )
-    
     # Générer un nom unique
     ext = Path(file.filename).suffix or mimetypes.guess_extension(file.content_type)
-    filename = f"{uuid.uuid4()}{ext}"
-    filepath = images_dir / filename
+    filename = f"{uuid.uuid4().hex}{ext}"
+    filepath = settings.IMAGES_DIR / filename
     
-    # Sauvegarder le fichier
+    # Sauvegarder le fichier par blocs (max 5MB pour les images)
     try:
-        with open(filepath, "wb") as f:
-            f.write(content)
-        
-        # Retourner l'URL relative
-        relative_url = f"/storage/images/{filename}"
-        return {"url": relative_url, "filename": filename}
-    
+        saved = await _write_upload(file, filepath, MAX_IMAGE_SIZE)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur d'upload: {str(e)}")
 
+    if not saved:
+        raise HTTPException(
+            status_code=400,
+            detail="Image trop volumineux (max 5MB)"
+        )
+
+    # Retourner l'URL relative
+    relative_url = f"/storage/images/{filename}"
+    return {"url": relative_url, "filename": filename}
+
 
 # ============================================================================
 # API - DOCUMENTS (CRUD)
@@ -158,8 +287,7 @@ async def upload_image(file: UploadFile = File(...)):
 @router.get("/api/documents")
 async def list_documents(
     limit: int = 20,
-    offset: int = 0,
-    session: Session = Depends(get_session)
+    offset: int = 0
 ):
     """
     Liste les flipbooks (galerie vide car tous les flipbooks sont privés par défaut).
@@ -176,8 +304,8 @@ async def list_documents(
     return []
 
 
-@router.get("/api/documents/{doc_id}")
-async def get_document(doc_id: str, session: Session = Depends(get_session)):
+@router.get("/api/documents/{doc_id}", response_model=FlipbookResponse)
+async def get_document(doc_id: str, session: AsyncSession = Depends(get_readonly_session)):
     """
     Recupere les details d'un flipbook.
 
@@ -187,28 +315,23 @@ async def get_document(doc_id: str, session: Session = Depends(get_session)):
     Returns:
         Details complets du flipbook
     """
-    statement = (
-        select(Flipbook)
-        .where(Flipbook.id == doc_id)
-        .options(selectinload(Flipbook.pages))
-    )
-    flipbook = session.exec(statement).first()
+    # Le nombre de pages est stocke sur le flipbook: inutile de charger les pages
+    flipbook = await session.get(Flipbook, doc_id)
 
     if not flipbook:
         raise HTTPException(status_code=404, detail="Document non trouve")
 
-    return {
-        "id": flipbook.id,
-        "title": flipbook.title,
-        "pages": len(flipbook.pages),
-        "thumbnail": flipbook.thumbnail,
-        "created_at": flipbook.created_at.isoformat(),
-        "updated_at": flipbook.updated_at.isoformat(),
-    }
+    return flipbook
 
 
 @router.get("/api/documents/{doc_id}/page/{page_num}")
-async def get_page_image(doc_id: str, page_num: int, token: str = None, session: Session = Depends(get_session)):
+async def get_page_image(
+    doc_id: str,
+    page_num: int,
+    request: Request,
+    token: str = None,
+    session: AsyncSession = Depends(get_readonly_session)
+):
     """
     Recupere l'image d'une page.
 
@@ -218,24 +341,46 @@ async def get_page_image(doc_id: str, page_num: int, token: str = None, session:
         token: Token de partage (requis pour accéder aux pages)
 
     Returns:
-        Image WebP de la page
+        Image WebP de la page, ou 304 si le client a deja la version courante
     """
     # Vérifier le token du flipbook
-    flipbook = session.get(Flipbook, doc_id)
+    flipbook = await session.get(Flipbook, doc_id)
     
     if not flipbook or not token or token != flipbook.share_token:
         raise HTTPException(status_code=403, detail="Accès refusé")
     
     page_path = settings.PAGES_DIR / doc_id / f"page_{page_num}.webp"
 
-    if not page_path.exists():
+    # Un seul stat: sert a l'existence, a l'ETag et aux en-tetes de la reponse
+    try:
+        stat_result = page_path.stat()
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Page non trouvee")
 
-    return FileResponse(page_path, media_type="image/webp")
+    headers = {"ETag": _file_etag(stat_result), "Cache-Control": PAGE_CACHE_CONTROL}
+
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    if settings.USE_X_ACCEL:
+        # nginx envoie le fichier lui-meme (sendfile), Python ne lit rien
+        headers["X-Accel-Redirect"] = f"{settings.X_ACCEL_PAGES_PREFIX}/{doc_id}/page_{page_num}.webp"
+        return Response(media_type="image/webp", headers=headers)
+
+    return FileResponse(
+        page_path,
+        media_type="image/webp",
+        headers=headers,
+        stat_result=stat_result
+    )
 
 
 @router.delete("/api/documents/{doc_id}")
-async def delete_document(doc_id: str, session: Session = Depends(get_session)):
+async def delete_document(
+    doc_id: str,
+    background_tasks: BackgroundTasks,
+    session: AsyncSession = Depends(get_session)
+):
     """
     Supprime un flipbook et tous ses fichiers associes.
 
@@ -245,19 +390,19 @@ async def delete_document(doc_id: str, session: Session = Depends(get_session)):
     Returns:
         Confirmation de suppression
     """
-    flipbook = session.get(Flipbook, doc_id)
+    # Seul le chemin du PDF est necessaire: pas d'hydratation du flipbook
+    pdf_path = (await session.exec(_FLIPBOOK_PDF_PATH, params={"doc_id": doc_id})).scalar_one_or_none()
 
-    if not flipbook:
+    if pdf_path is None:
         raise HTTPException(status_code=404, detail="Document non trouve")
 
-    pdf_path = flipbook.path_pdf
-
-    # La suppression en cascade est geree par SQLModel (cascade="all, delete-orphan")
-    session.delete(flipbook)
-    session.commit()
+    # Suppression en SQL, sans charger les pages ni les widgets
+    await pdf_service.delete_flipbook_rows(session, doc_id)
+    await session.commit()
 
-    # Suppression des fichiers
-    await pdf_service.delete_flipbook_files(doc_id, pdf_path)
+    # Suppression des fichiers apres l'envoi de la reponse: le document
+    # n'existe deja plus en base, le client n'a pas a attendre le disque
+    background_tasks.add_task(pdf_service.delete_flipbook_files, doc_id, pdf_path)
 
     return {"status": "deleted", "id": doc_id}
 
@@ -267,7 +412,11 @@ async def delete_document(doc_id: str, session: Session = Depends(get_session)):
 # ============================================================================
 
 @router.get("/api/editor/{doc_id}")
-async def get_editor_data(doc_id: str, session: Session = Depends(get_session)):
+async def get_editor_data(
+    doc_id: str,
+    request: Request,
+    session: AsyncSession = Depends(get_readonly_session)
+):
     """
     Recupere les donnees completes d'un flipbook pour l'editeur.
 
@@ -280,57 +429,62 @@ async def get_editor_data(doc_id: str, session: Session = Depends(get_session)):
         doc_id: ID du flipbook
 
     Returns:
-        JSON complet pour l'editeur
+        JSON complet pour l'editeur, ou 304 si le client a deja la version courante
     """
     try:
-        # Chargement avec toutes les relations
-        statement = (
-            select(Flipbook)
-            .where(Flipbook.id == doc_id)
-            .options(
-                selectinload(Flipbook.pages).selectinload(Page.widgets)
-            )
-        )
-        flipbook = session.exec(statement).first()
+        # Pre-verification sur la seule colonne updated_at: sur un 304,
+        # ni les pages ni les widgets ne sont charges
+        result = await session.exec(_FLIPBOOK_UPDATED_AT, params={"doc_id": doc_id})
+        updated_at = result.scalar_one_or_none()
+
+        if updated_at is None:
+            raise HTTPException(status_code=404, detail="Flipbook non trouve")
+
+        headers = _document_cache_headers(updated_at)
+        if _etag_matches(request, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        # Chargement avec toutes les relations, sans chargement paresseux
+        flipbook = (await session.exec(_editor_statement(doc_id))).first()
 
         if not flipbook:
             raise HTTPException(status_code=404, detail="Flipbook non trouve")
 
         # Construction des donnees des pages
         pages_data = []
-        for page in sorted(flipbook.pages, key=lambda p: p.page_num):
+        for page in flipbook.pages:
             page_dict = {
                 "id": page.id,
                 "page_num": page.page_num,
-                "image_url": f"/pages/{page.image_path}",
+                "image_url": page.image_url,
                 "width": page.width,
                 "height": page.height,
                 "widgets": [
                     {
                         "id": w.id,
                         "type": w.type,
-                        "props": w.props,
-                        "geometry": w.geometry,
+                        "props": raw_json(w.props_json),
+                        "geometry": raw_json(w.geometry_json),
                         "z_index": w.z_index
                     }
-                    for w in sorted(page.widgets, key=lambda w: w.z_index)
+                    for w in page.widgets
                 ]
             }
             pages_data.append(page_dict)
 
-        # Ensure style is a dict (not a property that could fail)
-        style_data = flipbook.style or {}
-
-        return {
+        # Les colonnes JSON sont transmises telles quelles (orjson.Fragment):
+        # la reponse est construite directement, jsonable_encoder ne sait
+        # pas traiter les fragments
+        return ORJSONResponse({
             "flipbook_id": flipbook.id,
             "id": flipbook.id,
             "title": flipbook.title,
-            "page_count": len(flipbook.pages),
-            "style": style_data,
-            "created_at": flipbook.created_at.isoformat(),
-            "updated_at": flipbook.updated_at.isoformat(),
+            "page_count": flipbook.page_count,
+            "style": raw_json(flipbook.style_json),
+            "created_at": flipbook.created_at,
+            "updated_at": flipbook.updated_at,
             "pages": pages_data
-        }
+        }, headers=_document_cache_headers(flipbook.updated_at))
     except HTTPException:
         raise
     except Exception as e:
@@ -342,7 +496,7 @@ async def get_editor_data(doc_id: str, session: Session = Depends(get_session)):
 async def save_editor_data(
     doc_id: str,
     data: dict,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
     """
     Sauvegarde les modifications de l'editeur.
@@ -381,68 +535,63 @@ async def save_editor_data(
     Returns:
         Confirmation avec timestamp
     """
-    # Chargement du flipbook avec pages et widgets
-    statement = (
-        select(Flipbook)
-        .where(Flipbook.id == doc_id)
-        .options(
-            selectinload(Flipbook.pages).selectinload(Page.widgets)
+    # Une seule transaction pour tout l'enregistrement: un seul commit
+    # (et donc une seule synchronisation disque) quel que soit le nombre de widgets.
+    # L'UPDATE du flipbook vient en premier: le verrou d'ecriture est pris
+    # des le debut plutot qu'au passage lecture -> ecriture
+    async with session.begin():
+        # Mise a jour du timestamp, du titre et du style si fournis
+        values = {"updated_at": datetime.utcnow()}
+        if "title" in data and data["title"]:
+            values["title"] = data["title"]
+        if "style" in data and data["style"]:
+            values["style_json"] = dump_json(data["style"])
+
+        # UPDATE ... RETURNING direct: ni SELECT prealable du flipbook, ni refresh
+        statement = (
+            update(Flipbook)
+            .where(Flipbook.id == doc_id)
+            .values(**values)
+            .returning(Flipbook.title, Flipbook.updated_at)
         )
-    )
-    flipbook = session.exec(statement).first()
+        flipbook = (await session.exec(statement)).first()
 
-    if not flipbook:
-        raise HTTPException(status_code=404, detail="Flipbook non trouve")
+        if not flipbook:
+            raise HTTPException(status_code=404, detail="Flipbook non trouve")
 
-    # Mise a jour du titre si fourni
-    if "title" in data and data["title"]:
-        flipbook.title = data["title"]
-
-    # Mise a jour du style si fourni
-    if "style" in data and data["style"]:
-        flipbook.style_json = json.dumps(data["style"], ensure_ascii=False)
-
-    # Mise a jour du timestamp
-    flipbook.updated_at = datetime.utcnow()
-
-    # Traitement des pages et widgets
-    if "pages" in data:
-        # Creer un dictionnaire page_num -> Page pour acces rapide
-        pages_by_num = {p.page_num: p for p in flipbook.pages}
-
-        for page_data in data["pages"]:
-            page_num = page_data.get("page_num")
-            if not page_num or page_num not in pages_by_num:
-                continue
-
-            page = pages_by_num[page_num]
-
-            # Suppression de tous les widgets existants de cette page
-            for widget in page.widgets:
-                session.delete(widget)
-
-            # Creation des nouveaux widgets
-            widgets_data = page_data.get("widgets", [])
-            for widget_data in widgets_data:
-                widget = Widget(
-                    page_id=page.id,
-                    type=widget_data.get("type", "link"),
-                    props_json=json.dumps(widget_data.get("props", {}), ensure_ascii=False),
-                    geometry_json=json.dumps(widget_data.get("geometry", {}), ensure_ascii=False),
-                    z_index=widget_data.get("z_index", 0)
+        # Traitement des pages et widgets
+        if "pages" in data:
+            # Dictionnaire page_num -> page_id, sans charger les objets Page
+            result = await session.exec(_PAGE_IDS_BY_NUM, params={"doc_id": doc_id})
+            page_ids_by_num = dict(result.all())
+
+            page_ids = []
+            widget_rows = []
+
+            for page_data in data["pages"]:
+                page_num = page_data.get("page_num")
+                if not page_num or page_num not in page_ids_by_num:
+                    continue
+
+                page_id = page_ids_by_num[page_num]
+                page_ids.append(page_id)
+                widget_rows.extend(
+                    Widget.row_from_dict(page_id, widget_data)
+                    for widget_data in page_data.get("widgets", [])
                 )
-                session.add(widget)
 
-    # Commit des changements
-    session.add(flipbook)
-    session.commit()
-    session.refresh(flipbook)
+            # Un seul DELETE pour les widgets existants des pages concernees,
+            # puis un seul INSERT multi-lignes pour les nouveaux
+            if page_ids:
+                await session.exec(delete(Widget).where(Widget.page_id.in_(page_ids)))
+            if widget_rows:
+                await session.exec(insert(Widget), params=widget_rows)
 
     return {
         "status": "saved",
         "flipbook_id": doc_id,
         "title": flipbook.title,
-        "updated_at": flipbook.updated_at.isoformat()
+        "updated_at": flipbook.updated_at
     }
 
 
@@ -455,7 +604,7 @@ async def add_widget(
     doc_id: str,
     page_num: int,
     widget_data: dict,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
     """
     Ajoute un widget a une page specifique.
@@ -476,38 +625,28 @@ async def add_widget(
     Returns:
         Widget cree avec son ID
     """
-    # Recherche de la page
-    statement = select(Page).where(
-        Page.flipbook_id == doc_id,
-        Page.page_num == page_num
-    )
-    page = session.exec(statement).first()
+    # Recherche de l'ID de la page (sans charger l'objet Page)
+    result = await session.exec(_PAGE_ID_BY_NUM, params={"doc_id": doc_id, "page_num": page_num})
+    # Premiere ligne seulement: une ancienne base peut contenir des numeros
+    # de page en double (voir l'index unique ix_page_flipbook_id_page_num)
+    page_id = result.scalar()
 
-    if not page:
+    if page_id is None:
         raise HTTPException(status_code=404, detail="Page non trouvee")
 
-    # Creation du widget
-    widget = Widget(
-        page_id=page.id,
-        type=widget_data.get("type", "link"),
-        props_json=json.dumps(widget_data.get("props", {}), ensure_ascii=False),
-        geometry_json=json.dumps(widget_data.get("geometry", {}), ensure_ascii=False),
-        z_index=widget_data.get("z_index", 0)
-    )
-    session.add(widget)
+    # Creation du widget: INSERT ... RETURNING, pas de refresh apres commit
+    row = Widget.row_from_dict(page_id, widget_data)
+    result = await session.exec(insert(Widget).values(**row).returning(Widget.id))
+    widget = Widget(id=result.scalar_one(), **row)
 
     # Mise a jour du timestamp du flipbook
-    flipbook = session.get(Flipbook, doc_id)
-    if flipbook:
-        flipbook.updated_at = datetime.utcnow()
-        session.add(flipbook)
+    await _touch_flipbook(session, doc_id)
 
-    session.commit()
-    session.refresh(widget)
+    await session.commit()
 
     return {
         "status": "created",
-        "widget": widget.to_dict()
+        "widget": WidgetResponse.model_validate(widget)
     }
 
 
@@ -516,7 +655,7 @@ async def update_widget(
     doc_id: str,
     widget_id: int,
     widget_data: dict,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
     """
     Met a jour un widget existant.
@@ -529,44 +668,44 @@ async def update_widget(
     Returns:
         Widget mis a jour
     """
-    # Recherche du widget avec verification du flipbook
-    statement = (
-        select(Widget)
-        .join(Page)
-        .where(
-            Widget.id == widget_id,
-            Page.flipbook_id == doc_id
-        )
-    )
-    widget = session.exec(statement).first()
-
-    if not widget:
-        raise HTTPException(status_code=404, detail="Widget non trouve")
-
-    # Mise a jour des champs
+    # Champs a mettre a jour
+    values = {}
     if "type" in widget_data:
-        widget.type = widget_data["type"]
+        values["type"] = widget_data["type"]
     if "props" in widget_data:
-        widget.props_json = json.dumps(widget_data["props"], ensure_ascii=False)
+        values["props_json"] = dump_json(widget_data["props"])
     if "geometry" in widget_data:
-        widget.geometry_json = json.dumps(widget_data["geometry"], ensure_ascii=False)
+        values["geometry_json"] = dump_json(widget_data["geometry"])
     if "z_index" in widget_data:
-        widget.z_index = widget_data["z_index"]
+        values["z_index"] = widget_data["z_index"]
+
+    # Le filtre sur les pages du flipbook verifie l'appartenance du widget
+    criteria = (Widget.id == widget_id, Widget.page_id.in_(_flipbook_page_ids(doc_id)))
 
-    session.add(widget)
+    # Un seul UPDATE ... RETURNING remplace la lecture puis l'ecriture du widget
+    if values:
+        statement = (
+            update(Widget)
+            .where(*criteria)
+            .values(**values)
+            .returning(Widget)
+            .execution_options(synchronize_session=False)
+        )
+        widget = (await session.exec(statement)).scalar_one_or_none()
+    else:
+        widget = (await session.exec(select(Widget).where(*criteria))).one_or_none()
+
+    if not widget:
+        raise HTTPException(status_code=404, detail="Widget non trouve")
 
     # Mise a jour du timestamp du flipbook
-    flipbook = session.get(Flipbook, doc_id)
-    if flipbook:
-        flipbook.updated_at = datetime.utcnow()
-        session.add(flipbook)
+    await _touch_flipbook(session, doc_id)
 
-    session.commit()
-    session.refresh(widget)
+    await session.commit()
 
     return {
         "status": "updated",
-        "widget": widget.to_dict()
+        "widget": WidgetResponse.model_validate(widget)
     }
 
 
@@ -574,7 +713,7 @@ async def update_widget(
 async def delete_widget(
     doc_id: str,
     widget_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_session)
 ):
     """
     Supprime un widget.
@@ -586,29 +725,21 @@ async def delete_widget(
     Returns:
         Confirmation de suppression
     """
-    # Recherche du widget avec verification du flipbook
-    statement = (
-        select(Widget)
-        .join(Page)
-        .where(
+    # Suppression directe, le filtre sur les pages verifie l'appartenance au flipbook
+    result = await session.exec(
+        delete(Widget).where(
             Widget.id == widget_id,
-            Page.flipbook_id == doc_id
+            Widget.page_id.in_(_flipbook_page_ids(doc_id))
         )
     )
-    widget = session.exec(statement).first()
 
-    if not widget:
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Widget non trouve")
 
-    session.delete(widget)
-
     # Mise a jour du timestamp du flipbook
-    flipbook = session.get(Flipbook, doc_id)
-    if flipbook:
-        flipbook.updated_at = datetime.utcnow()
-        session.add(flipbook)
+    await _touch_flipbook(session, doc_id)
 
-    session.commit()
+    await session.commit()
 
     return {
         "status": "deleted",
@@ -620,28 +751,93 @@ async def delete_widget(
 # API - READER (DONNEES POUR AFFICHAGE)
 # ============================================================================
 
+# Nombre de pages chargees par lot lors du streaming du reader
+READER_STREAM_BATCH = 20
+
+
+def _reader_page_dict(page: Page) -> dict:
+    """Donnees d'une page pour le reader"""
+    return {
+        "page_num": page.page_num,
+        "image_url": page.image_url,
+        "image_path": page.image_url,
+        "width": page.width,
+        "height": page.height,
+        "widgets": [
+            {
+                "id": w.id,
+                "type": w.type,
+                "props": raw_json(w.props_json),
+                "geometry": raw_json(w.geometry_json),
+                "z_index": w.z_index
+            }
+            for w in page.widgets
+        ]
+    }
+
+
+async def _stream_reader_data(doc_id: str, head: dict) -> AsyncGenerator[bytes, None]:
+    """
+    Produit le JSON du reader par morceaux: l'en-tete du flipbook, puis les
+    pages une a une au fur et a mesure de leur lecture en base.
+
+    Le document final reste un unique objet JSON identique a la version
+    non streamee: seul le nombre de pages en memoire a un instant change.
+
+    La lecture se fait dans une session transactionnelle: sur PostgreSQL,
+    le curseur serveur utilise par stream_scalars (DECLARE ... CURSOR)
+    n'existe qu'a l'interieur d'une transaction, pas en autocommit.
+    L'en-tete n'est produit qu'une fois la requete acceptee par la base.
+    """
+    statement = (
+        select(Page)
+        .where(Page.flipbook_id == doc_id)
+        .order_by(Page.page_num, Page.id)
+        .options(selectinload(Page.widgets).raiseload("*"), raiseload("*"))
+        .execution_options(yield_per=READER_STREAM_BATCH)
+    )
+    async with AsyncSessionLocal() as session:
+        pages = await session.stream_scalars(statement)
+
+        # En-tete sans l'accolade finale, la liste des pages suit
+        yield orjson.dumps(head)[:-1] + b',"pages":['
+
+        separator = b""
+        async for page in pages:
+            yield separator + orjson.dumps(_reader_page_dict(page))
+            separator = b","
+
+    yield b"]}"
+
+
+async def _prepend_chunk(first: bytes, rest: AsyncGenerator[bytes, None]) -> AsyncGenerator[bytes, None]:
+    """Renvoie un morceau deja lu puis la suite du generateur"""
+    yield first
+    async for chunk in rest:
+        yield chunk
+
+
 @router.get("/api/reader/{doc_id}")
-async def get_reader_data(doc_id: str, token: str = None, session: Session = Depends(get_session)):
+async def get_reader_data(
+    doc_id: str,
+    request: Request,
+    token: str = None,
+    session: AsyncSession = Depends(get_readonly_session)
+):
     """
     Recupere les donnees optimisees pour le lecteur de flipbook.
 
-    Inclut toutes les pages et widgets pour un affichage fluide.
+    Inclut toutes les pages et widgets pour un affichage fluide. La reponse
+    est envoyee en streaming, page par page.
 
     Args:
         doc_id: ID du flipbook
         token: Token de partage (requis pour accéder au flipbook privé)
 
     Returns:
-        Donnees completes pour le reader
+        Donnees completes pour le reader, ou 304 si le client a deja la version courante
     """
-    statement = (
-        select(Flipbook)
-        .where(Flipbook.id == doc_id)
-        .options(
-            selectinload(Flipbook.pages).selectinload(Page.widgets)
-        )
-    )
-    flipbook = session.exec(statement).first()
+    flipbook = await session.get(Flipbook, doc_id)
 
     if not flipbook:
         raise HTTPException(status_code=404, detail="Flipbook non trouve")
@@ -650,25 +846,34 @@ async def get_reader_data(doc_id: str, token: str = None, session: Session = Dep
     if not token or token != flipbook.share_token:
         raise HTTPException(status_code=403, detail="Accès refusé - token invalide ou manquant")
 
-    pages_data = []
-    for page in sorted(flipbook.pages, key=lambda p: p.page_num):
-        pages_data.append({
-            "page_num": page.page_num,
-            "image_url": f"/pages/{page.image_path}",
-            "image_path": f"/pages/{page.image_path}",
-            "width": page.width,
-            "height": page.height,
-            "widgets": [w.to_dict() for w in page.widgets]
-        })
+    # Validation apres le controle du token: un 304 ne doit rien reveler
+    headers = _document_cache_headers(flipbook.updated_at)
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
 
-    return {
+    head = {
         "id": flipbook.id,
         "title": flipbook.title,
-        "page_count": len(flipbook.pages),
-        "style": flipbook.style,
-        "pages": pages_data
+        "page_count": flipbook.page_count,
+        "style": raw_json(flipbook.style_json),
     }
 
+    # Les pages sont lues dans une session propre au generateur: celle de
+    # la dependance est fermee avant l'envoi du corps de la reponse
+    body = _stream_reader_data(doc_id, head)
+
+    # Premier morceau lu avant l'envoi des en-tetes: une erreur a l'ouverture
+    # de la requete donne une vraie erreur 500, pas un 200 au JSON tronque.
+    # Une erreur plus tardive interrompt la connexion sans terminer la
+    # reponse: le client voit un echec de transfert, jamais un JSON valide
+    first_chunk = await anext(body)
+
+    return StreamingResponse(
+        _prepend_chunk(first_chunk, body),
+        media_type="application/json",
+        headers=headers
+    )
+
 
 # ============================================================================
 # DEBUG - DIAGNOSTIQUE DU SERVEUR
@@ -711,3 +916,9 @@ async def debug_storage():
         debug_info["uploads_contents"] = [u.name for u in uploads]
     
     return debug_info
+
+
+# Garde-fou: une route (chemin + methode) declaree deux fois serait masquee
+# silencieusement par la premiere
+_route_keys = [(route.path, method) for route in router.routes for method in route.methods]
+assert len(set(_route_keys)) == len(_route_keys), "Route declaree plusieurs fois dans app/routes.py"
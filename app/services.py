@@ -1,22 +1,75 @@
 import asyncio
-import json
+import multiprocessing
+import shutil
+import threading
 from pathlib import Path
-from typing import List, Tuple, Optional
-from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from itertools import islice
+from typing import Iterator, List, Tuple, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from dataclasses import dataclass
 
 import fitz  # PyMuPDF
 from PIL import Image
-import aiofiles
-import aiofiles.os
+from sqlalchemy import delete, insert
+from sqlmodel import select
 
 from .config import settings
-from .models import Flipbook, Page, Widget, generate_uuid
-from .database import Session
+from .models import Flipbook, Page, Widget, dump_json, generate_uuid
+from .database import AsyncSession
 
-# Pool de threads pour les operations CPU-bound (conversion PDF)
-executor = ThreadPoolExecutor(max_workers=4)
+# Pool de processus pour le rendu des pages (CPU-bound, pages independantes)
+RENDER_WORKERS = settings.RENDER_WORKERS
+
+# Processus crees par un serveur dedie (forkserver) et non par fork() du
+# processus principal: celui-ci a des threads (boucle asyncio, aiosqlite)
+# dont les verrous seraient copies dans un etat incoherent
+_render_mp_context = multiprocessing.get_context("forkserver")
+_render_mp_context.set_forkserver_preload([__name__])
+
+
+def _new_process_pool() -> ProcessPoolExecutor:
+    """Cree le pool de processus de rendu"""
+    return ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=_render_mp_context)
+
+
+process_pool = _new_process_pool()
+_process_pool_lock = threading.Lock()
+
+
+def _replace_broken_pool(broken_pool: ProcessPoolExecutor) -> None:
+    """
+    Remplace le pool de rendu apres la mort d'un processus (OOM, crash MuPDF).
+
+    Un ProcessPoolExecutor casse le reste definitivement: sans remplacement,
+    tous les uploads suivants echoueraient jusqu'au redemarrage du serveur.
+    Le verrou evite que deux conversions concurrentes le remplacent deux fois.
+    """
+    global process_pool
+    with _process_pool_lock:
+        if process_pool is broken_pool:
+            process_pool = _new_process_pool()
+    broken_pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Pool de threads pilotant les conversions hors de la boucle d'evenements:
+# ces threads ne font pas d'I/O, ils attendent les resultats du pool de processus
+render_orchestration_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="openflip-render")
+
+
+def shutdown_pools() -> None:
+    """Arrete les pools d'execution (fin de vie de l'application)"""
+    process_pool.shutdown(wait=False, cancel_futures=True)
+    render_orchestration_pool.shutdown(wait=False, cancel_futures=True)
+
+# Pages rendues par tache du pool, et nombre maximal de taches en cours
+RENDER_PAGES_PER_TASK = 4
+MAX_PENDING_RENDERS = 2 * RENDER_WORKERS
+
+# Pages ecrites en base par transaction: une fenetre de rendu complete
+PAGE_INSERT_BATCH = RENDER_PAGES_PER_TASK * MAX_PENDING_RENDERS
 
 
 # ============================================================================
@@ -44,15 +97,7 @@ class PageRenderResult:
     image_path: str
     width: int
     height: int
-    links: List[dict]
-
-
-@dataclass
-class ConversionResult:
-    """Resultat complet de la conversion"""
-    doc_id: str
-    page_count: int
-    pages: List[PageRenderResult]
+    links: List[dict]  # Colonnes des widgets "link", JSON deja serialise (sans page_id)
 
 
 # ============================================================================
@@ -63,8 +108,10 @@ class PDFService:
     """Service de conversion PDF vers flipbook"""
 
     # Configuration
-    DPI: int = 150  # Resolution de rendu
+    DPI: int = settings.RENDER_DPI  # Resolution de rendu
     WEBP_QUALITY: int = 85  # Qualite WebP (0-100)
+    WEBP_METHOD: int = 4  # Effort d'encodage WebP (0 = rapide, 6 = fichiers plus petits)
+    RENDER_ANNOTS: bool = True  # Rendu des annotations PDF (surlignages, tampons...)
 
     @staticmethod
     def generate_id() -> str:
@@ -76,12 +123,12 @@ class PDFService:
     # -------------------------------------------------------------------------
 
     @staticmethod
-    async def save_pdf_async(content: bytes, doc_id: str) -> Path:
+    async def save_pdf_async(upload_path: Path, doc_id: str) -> Path:
         """
-        Sauvegarde le PDF uploade de maniere asynchrone.
+        Deplace le PDF uploade vers son emplacement definitif.
 
         Args:
-            content: Contenu binaire du PDF
+            upload_path: Fichier temporaire contenant le PDF
             doc_id: ID du document
 
         Returns:
@@ -89,8 +136,8 @@ class PDFService:
         """
         pdf_path = settings.UPLOAD_DIR / f"{doc_id}.pdf"
 
-        async with aiofiles.open(pdf_path, "wb") as f:
-            await f.write(content)
+        # Meme repertoire: simple renommage, aucune copie des donnees
+        await asyncio.to_thread(upload_path.rename, pdf_path)
 
         return pdf_path
 
@@ -107,26 +154,18 @@ class PDFService:
         """
         pages_dir = settings.PAGES_DIR / doc_id
 
-        # aiofiles.os.makedirs n'existe pas, on utilise run_in_executor
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, lambda: pages_dir.mkdir(exist_ok=True))
+        await asyncio.to_thread(pages_dir.mkdir, exist_ok=True)
 
         return pages_dir
 
     @staticmethod
-    async def delete_file_async(path: Path) -> None:
-        """Supprime un fichier de maniere asynchrone"""
-        if path.exists():
-            await aiofiles.os.remove(path)
-
-    @staticmethod
-    async def delete_dir_async(path: Path) -> None:
-        """Supprime un repertoire et son contenu"""
-        import shutil
-
-        loop = asyncio.get_event_loop()
-        if path.exists():
-            await loop.run_in_executor(None, lambda: shutil.rmtree(path))
+    def cleanup_sync(pdf_path: Path, pages_dir: Path) -> None:
+        """
+        Supprime le PDF et le repertoire des pages d'un flipbook (synchrone).
+        Appele via un seul asyncio.to_thread pour les deux suppressions.
+        """
+        pdf_path.unlink(missing_ok=True)
+        shutil.rmtree(pages_dir, ignore_errors=True)
 
     # -------------------------------------------------------------------------
     # EXTRACTION PDF (SYNC - CPU BOUND)
@@ -144,27 +183,66 @@ class PDFService:
         Returns:
             Liste des liens avec leurs coordonnees
         """
+        # Cas le plus frequent (scans, pages sans liens): sortie immediate,
+        # sans construire la liste de get_links()
+        if page.first_link is None:
+            return []
+
         links = []
         for link in page.get_links():
             uri = link.get("uri")
-            if uri:
-                rect = link.get("from", fitz.Rect())
-                links.append({
-                    "url": uri,
-                    "x": round(rect.x0, 2),
-                    "y": round(rect.y0, 2),
-                    "width": round(rect.width, 2),
-                    "height": round(rect.height, 2),
-                })
+            rect = link.get("from")
+            if not uri or rect is None:
+                continue
+            # Arrondi au centieme: les coordonnees PyMuPDF (float32) donneraient
+            # sinon des chaines comme 10.123000144958496 dans chaque reponse
+            # de l'editeur et du reader
+            links.append({
+                "url": uri,
+                "x": round(rect.x0, 2),
+                "y": round(rect.y0, 2),
+                "width": round(rect.width, 2),
+                "height": round(rect.height, 2),
+            })
         return links
 
+    @staticmethod
+    def link_widget_columns(link: dict) -> dict:
+        """
+        Colonnes du widget "link" correspondant a un lien extrait.
+
+        Appele dans les processus de rendu: la serialisation JSON des liens
+        se fait en parallele, hors de la boucle d'evenements.
+        """
+        return {
+            "type": "link",
+            "props_json": dump_json({"url": link["url"], "target": "_blank"}),
+            "geometry_json": dump_json({
+                "x": link["x"],
+                "y": link["y"],
+                "width": link["width"],
+                "height": link["height"]
+            }),
+            "z_index": 0
+        }
+
     @classmethod
+    def render_matrix(cls, dpi: int = None) -> fitz.Matrix:
+        """
+        Matrice de zoom pour une resolution donnee (defaut: DPI).
+        Calculee une fois puis reutilisee pour toutes les pages.
+        """
+        zoom = (dpi or cls.DPI) / 72
+        return fitz.Matrix(zoom, zoom)
+
+    @staticmethod
     def render_page_to_webp(
-        cls,
         page: fitz.Page,
         output_path: Path,
-        dpi: int = None,
-        quality: int = None
+        matrix: fitz.Matrix,
+        quality: int,
+        method: int,
+        annots: bool = True
     ) -> Tuple[int, int]:
         """
         Convertit une page PDF en image WebP.
@@ -172,52 +250,56 @@ class PDFService:
         Args:
             page: Page PyMuPDF
             output_path: Chemin de sortie
-            dpi: Resolution (defaut: 150)
-            quality: Qualite WebP (defaut: 85)
+            matrix: Matrice de zoom (voir render_matrix)
+            quality: Qualite WebP (0-100)
+            method: Effort d'encodage WebP (0-6)
+            annots: Inclure les annotations PDF dans le rendu
 
         Returns:
             Tuple (width, height) de l'image
         """
-        dpi = dpi or cls.DPI
-        quality = quality or cls.WEBP_QUALITY
-
-        # Calcul de la matrice de zoom
-        zoom = dpi / 72
-        matrix = fitz.Matrix(zoom, zoom)
-
         # Rendu de la page
-        pix = page.get_pixmap(matrix=matrix, alpha=False)
+        # RGB sans alpha: format attendu tel quel par Pillow, aucune conversion
+        pix = page.get_pixmap(matrix=matrix, alpha=False, colorspace=fitz.csRGB, annots=annots)
 
-        # Conversion en image Pillow et sauvegarde WebP
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        img.save(output_path, "WEBP", quality=quality)
+        # Conversion en image Pillow puis sauvegarde WebP.
+        # samples_mv est une vue sur la memoire du pixmap (samples en renverrait
+        # une copie en bytes). Pillow recopie tout de meme le bitmap: il ne
+        # partage un buffer externe que pour certains modes (L, RGBA, RGBX...),
+        # pas pour RGB
+        img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples_mv, "raw", "RGB", pix.stride)
+        img.save(output_path, "WEBP", quality=quality, method=method, lossless=False)
 
         return pix.width, pix.height
 
     @classmethod
-    def convert_pdf_sync(cls, pdf_path: Path, doc_id: str) -> ConversionResult:
+    def render_page_range(cls, pdf_path: Path, doc_id: str, start: int, stop: int) -> List[PageRenderResult]:
         """
-        Convertit un PDF en images WebP (operation synchrone CPU-bound).
+        Rend une plage de pages consecutives (execute dans un processus du pool).
+
+        Le document PyMuPDF n'est pas transmissible entre processus: chaque
+        plage rouvre le PDF une seule fois pour toutes ses pages.
 
         Args:
             pdf_path: Chemin du PDF
             doc_id: ID du document
+            start: Index de la premiere page (inclus)
+            stop: Index de la derniere page (exclu)
 
         Returns:
-            ConversionResult avec toutes les pages
+            Liste des PageRenderResult de la plage, dans l'ordre
         """
         pages_dir = settings.PAGES_DIR / doc_id
-        pages_dir.mkdir(exist_ok=True)
-
-        try:
-            pdf_doc = fitz.open(pdf_path)
-        except Exception as e:
-            raise PDFConversionError(f"Impossible d'ouvrir le PDF: {str(e)}")
-
         pages: List[PageRenderResult] = []
 
-        try:
-            for page_idx in range(len(pdf_doc)):
+        # Parametres de rendu resolus une fois pour toute la plage
+        matrix = cls.render_matrix()
+        quality = cls.WEBP_QUALITY
+        method = cls.WEBP_METHOD
+        annots = cls.RENDER_ANNOTS
+
+        with fitz.open(pdf_path) as pdf_doc:
+            for page_idx in range(start, stop):
                 page = pdf_doc[page_idx]
                 page_num = page_idx + 1
 
@@ -226,10 +308,13 @@ class PDFService:
                 image_path = pages_dir / image_filename
 
                 # Rendu de la page
-                width, height = cls.render_page_to_webp(page, image_path)
+                width, height = cls.render_page_to_webp(page, image_path, matrix, quality, method, annots)
 
-                # Extraction des liens
-                links = cls.extract_links_from_page(page, page_num)
+                # Extraction des liens, deja sous forme de colonnes de widgets
+                links = [
+                    cls.link_widget_columns(link)
+                    for link in cls.extract_links_from_page(page, page_num)
+                ]
 
                 pages.append(PageRenderResult(
                     page_num=page_num,
@@ -239,16 +324,85 @@ class PDFService:
                     links=links
                 ))
 
-            return ConversionResult(
-                doc_id=doc_id,
-                page_count=len(pdf_doc),
-                pages=pages
-            )
+        return pages
+
+    @classmethod
+    def iter_render_pages(cls, pdf_path: Path, doc_id: str, page_count: int) -> Iterator[PageRenderResult]:
+        """
+        Rend les pages sur le pool de processus et les produit dans l'ordre.
 
+        Les pages sont envoyees par petites plages et le nombre de plages en
+        cours est plafonne (MAX_PENDING_RENDERS): les taches soumises au pool
+        restent bornees quelle que soit la taille du PDF. process_pdf consomme
+        les resultats lot par lot (next_render_batch) et les ecrit en base au
+        fur et a mesure, sans jamais les garder tous.
+
+        Args:
+            pdf_path: Chemin du PDF
+            doc_id: ID du document
+            page_count: Nombre de pages du PDF
+
+        Yields:
+            PageRenderResult, page par page
+        """
+        # Meme pool pour toute la conversion, meme s'il est remplace entre-temps
+        pool = process_pool
+        pending = deque()
+        try:
+            for start in range(0, page_count, RENDER_PAGES_PER_TASK):
+                if len(pending) >= MAX_PENDING_RENDERS:
+                    yield from pending.popleft().result()
+                stop = min(start + RENDER_PAGES_PER_TASK, page_count)
+                pending.append(pool.submit(cls.render_page_range, pdf_path, doc_id, start, stop))
+
+            while pending:
+                yield from pending.popleft().result()
+        except BrokenProcessPool:
+            # Seules les conversions en cours sur ce pool echouent,
+            # les suivantes utilisent un pool neuf
+            _replace_broken_pool(pool)
+            raise PDFConversionError("Processus de rendu interrompu, veuillez reessayer")
+        finally:
+            # Arret premature (erreur): les plages pas encore demarrees sont annulees
+            for future in pending:
+                future.cancel()
+
+    @staticmethod
+    def count_pages_sync(pdf_path: Path) -> int:
+        """
+        Ouvre le PDF et renvoie son nombre de pages (synchrone).
+
+        Args:
+            pdf_path: Chemin du PDF
+
+        Returns:
+            Nombre de pages du PDF
+        """
+        try:
+            with fitz.open(pdf_path) as pdf_doc:
+                return len(pdf_doc)
+        except Exception as e:
+            raise PDFConversionError(f"Impossible d'ouvrir le PDF: {str(e)}")
+
+    @staticmethod
+    def next_render_batch(pages: Iterator[PageRenderResult], size: int) -> List[PageRenderResult]:
+        """
+        Attend les pages suivantes du rendu (bloquant: execute dans
+        render_orchestration_pool, hors de la boucle d'evenements).
+
+        Args:
+            pages: Generateur de iter_render_pages
+            size: Nombre maximal de pages du lot
+
+        Returns:
+            Liste des pages du lot, vide quand le rendu est termine
+        """
+        try:
+            return list(islice(pages, size))
+        except PDFConversionError:
+            raise
         except Exception as e:
             raise PDFConversionError(f"Erreur de conversion: {str(e)}")
-        finally:
-            pdf_doc.close()
 
     # -------------------------------------------------------------------------
     # TRAITEMENT COMPLET (ASYNC)
@@ -257,119 +411,168 @@ class PDFService:
     @classmethod
     async def process_pdf(
         cls,
-        content: bytes,
+        upload_path: Path,
         filename: str,
         custom_title: Optional[str],
-        session: Session
+        session: AsyncSession
     ) -> dict:
         """
         Traite un PDF complet:
-        1. Sauvegarde le PDF sur disque
-        2. Convertit les pages en WebP
-        3. Extrait les liens hypertextes
-        4. Cree les entrees en base de donnees
+        1. Deplace le PDF uploade vers son emplacement definitif
+        2. Cree le flipbook en base
+        3. Convertit les pages en WebP et extrait les liens hypertextes
+        4. Ecrit les pages et leurs liens en base, lot par lot
 
         Args:
-            content: Contenu binaire du PDF
+            upload_path: Fichier temporaire contenant le PDF uploade
             filename: Nom du fichier original
             custom_title: Titre personnalise (optionnel)
-            session: Session SQLModel
+            session: Session SQLModel asynchrone
 
         Returns:
             dict: Donnees du flipbook cree
         """
         doc_id = cls.generate_id()
+        loop = asyncio.get_running_loop()
+        flipbook_saved = False
+        pages = None
 
         # 1. Sauvegarde du PDF
-        pdf_path = await cls.save_pdf_async(content, doc_id)
+        pdf_path = await cls.save_pdf_async(upload_path, doc_id)
 
         try:
             # 2. Cree le repertoire des pages
             await cls.create_pages_dir(doc_id)
 
-            # 3. Conversion PDF (CPU-bound -> executor)
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                executor,
-                cls.convert_pdf_sync,
-                pdf_path,
-                doc_id
+            # 3. Nombre de pages (ouverture du PDF hors boucle d'evenements)
+            page_count = await loop.run_in_executor(
+                render_orchestration_pool,
+                cls.count_pages_sync,
+                pdf_path
             )
 
             # 4. Titre du flipbook
             title = custom_title or filename.replace(".pdf", "").replace("_", " ").title()
 
-            # 5. Creation du flipbook en base
+            # 5. Creation du flipbook en base, valide tout de suite: les pages
+            # suivent dans des transactions courtes, le verrou d'ecriture
+            # SQLite n'est pas garde pendant tout le rendu. L'ID du document
+            # n'est connu de personne avant la reponse a l'upload
             flipbook = Flipbook(
                 id=doc_id,
                 title=title,
                 path_pdf=str(pdf_path),
+                page_count=page_count,
                 created_at=datetime.utcnow(),
                 updated_at=datetime.utcnow()
             )
             session.add(flipbook)
-
-            # 6. Creation des pages en base
-            for page_result in result.pages:
-                page = Page(
-                    flipbook_id=doc_id,
-                    page_num=page_result.page_num,
-                    image_path=page_result.image_path,
-                    width=page_result.width,
-                    height=page_result.height
-                )
-                session.add(page)
-                session.flush()  # Pour obtenir l'ID de la page
-
-                # 7. Creation des widgets pour les liens extraits du PDF
-                for link_data in page_result.links:
-                    widget = Widget(
-                        page_id=page.id,
-                        type="link",
-                        props_json=json.dumps({
-                            "url": link_data["url"],
-                            "target": "_blank"
-                        }, ensure_ascii=False),
-                        geometry_json=json.dumps({
-                            "x": link_data["x"],
-                            "y": link_data["y"],
-                            "width": link_data["width"],
-                            "height": link_data["height"]
-                        }, ensure_ascii=False),
-                        z_index=0
-                    )
-                    session.add(widget)
-
-            # 8. Commit final
-            session.commit()
-            session.refresh(flipbook)
+            await session.commit()
+            flipbook_saved = True
+
+            # 6. Rendu dans process_pool, consomme lot par lot depuis
+            # render_orchestration_pool: seules les pages du lot courant
+            # sont en memoire, quelle que soit la taille du PDF
+            pages = cls.iter_render_pages(pdf_path, doc_id, page_count)
+            while batch := await loop.run_in_executor(
+                render_orchestration_pool,
+                cls.next_render_batch,
+                pages,
+                PAGE_INSERT_BATCH
+            ):
+                await cls.insert_page_batch(session, doc_id, batch)
+                await session.commit()
 
             # Retourne les donnees du flipbook avec le nombre de pages
             return {
                 "id": flipbook.id,
                 "title": flipbook.title,
-                "pages": result.page_count,
+                "pages": page_count,
                 "thumbnail": flipbook.thumbnail,
-                "created_at": flipbook.created_at.isoformat(),
-                "updated_at": flipbook.updated_at.isoformat(),
+                "created_at": flipbook.created_at,
+                "updated_at": flipbook.updated_at,
             }
 
-        except PDFConversionError:
-            # Nettoyage en cas d'erreur de conversion
-            await cls.delete_file_async(pdf_path)
-            await cls.delete_dir_async(settings.PAGES_DIR / doc_id)
-            raise
-
         except Exception as e:
-            # Nettoyage en cas d'erreur inattendue
-            await cls.delete_file_async(pdf_path)
-            await cls.delete_dir_async(settings.PAGES_DIR / doc_id)
+            # Nettoyage: rendus pas encore demarres, lignes deja validees, fichiers
+            if pages is not None:
+                pages.close()
+            await session.rollback()
+            if flipbook_saved:
+                await cls.delete_flipbook_rows(session, doc_id)
+                await session.commit()
+            await asyncio.to_thread(cls.cleanup_sync, pdf_path, settings.PAGES_DIR / doc_id)
+
+            if isinstance(e, PDFConversionError):
+                raise
             raise PDFConversionError(f"Erreur inattendue: {str(e)}")
 
+    @staticmethod
+    async def insert_page_batch(session: AsyncSession, doc_id: str, batch: List[PageRenderResult]) -> None:
+        """
+        Ecrit un lot de pages rendues et les widgets de leurs liens (sans commit).
+
+        Les pages sont inserees en un seul executemany sans RETURNING (avec
+        RETURNING, SQLite executerait un INSERT par ligne). Leurs IDs ne sont
+        relus, en un seul SELECT, que si le lot contient des liens.
+
+        Args:
+            session: Session SQLModel asynchrone
+            doc_id: ID du flipbook
+            batch: Pages rendues, dans l'ordre
+        """
+        page_rows = [
+            {
+                "flipbook_id": doc_id,
+                "page_num": page_result.page_num,
+                "image_path": page_result.image_path,
+                "width": page_result.width,
+                "height": page_result.height
+            }
+            for page_result in batch
+        ]
+        await session.exec(insert(Page), params=page_rows)
+
+        if not any(page_result.links for page_result in batch):
+            return
+
+        inserted = await session.exec(
+            select(Page.page_num, Page.id).where(
+                Page.flipbook_id == doc_id,
+                Page.page_num.between(batch[0].page_num, batch[-1].page_num)
+            )
+        )
+        page_ids_by_num = dict(inserted.all())
+
+        # Widgets des liens: colonnes JSON deja serialisees par les processus de rendu
+        link_rows = [
+            {"page_id": page_ids_by_num[page_result.page_num], **link_columns}
+            for page_result in batch
+            for link_columns in page_result.links
+        ]
+        await session.exec(insert(Widget), params=link_rows)
+
     # -------------------------------------------------------------------------
     # SUPPRESSION
     # -------------------------------------------------------------------------
 
+    @staticmethod
+    async def delete_flipbook_rows(session: AsyncSession, doc_id: str) -> None:
+        """
+        Supprime un flipbook, ses pages et leurs widgets en SQL (sans commit).
+
+        Enfants d'abord: la cascade ORM chargerait toutes les pages et tous
+        les widgets uniquement pour les supprimer.
+
+        Args:
+            session: Session SQLModel asynchrone
+            doc_id: ID du flipbook
+        """
+        page_ids = select(Page.id).where(Page.flipbook_id == doc_id)
+        await session.exec(delete(Widget).where(Widget.page_id.in_(page_ids)))
+        await session.exec(delete(Page).where(Page.flipbook_id == doc_id))
+        await session.exec(delete(Flipbook).where(Flipbook.id == doc_id))
+
     @classmethod
     async def delete_flipbook_files(cls, doc_id: str, pdf_path: Optional[str] = None) -> None:
         """
@@ -379,16 +582,11 @@ class PDFService:
             doc_id: ID du flipbook
             pdf_path: Chemin du PDF (optionnel)
         """
-        # Suppression du repertoire des pages
         pages_dir = settings.PAGES_DIR / doc_id
-        await cls.delete_dir_async(pages_dir)
-
-        # Suppression du PDF
-        if pdf_path:
-            await cls.delete_file_async(Path(pdf_path))
-        else:
-            default_pdf = settings.UPLOAD_DIR / f"{doc_id}.pdf"
-            await cls.delete_file_async(default_pdf)
+        pdf_file = Path(pdf_path) if pdf_path else settings.UPLOAD_DIR / f"{doc_id}.pdf"
+
+        # Repertoire des pages et PDF supprimes dans un seul appel au pool de threads
+        await asyncio.to_thread(cls.cleanup_sync, pdf_file, pages_dir)
 
 
 # Instance singleton du service
@@ -0,0 +1,53 @@
+"""
+La requete de l'editeur charge pages et widgets d'avance et interdit tout
+autre chargement paresseux: un acces a une relation non chargee doit lever
+une erreur au lieu d'emettre un SELECT implicite.
+"""
+import asyncio
+
+import pytest
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Flipbook, Page, Widget
+from app.routes import _editor_statement
+
+
+async def _load_editor_flipbook() -> Flipbook:
+    """Cree un flipbook en base memoire puis le relit avec la requete de l'editeur"""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(SQLModel.metadata.create_all)
+
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with session_factory() as session:
+            session.add(Flipbook(id="doc", title="Doc"))
+            session.add(Page(id=1, flipbook_id="doc", page_num=1, image_path="doc/page_1.webp"))
+            session.add(Widget(page_id=1, type="link"))
+            await session.commit()
+
+        async with session_factory() as session:
+            return (await session.exec(_editor_statement("doc"))).first()
+    finally:
+        await engine.dispose()
+
+
+def test_editor_statement_loads_pages_and_widgets():
+    flipbook = asyncio.run(_load_editor_flipbook())
+
+    assert [page.page_num for page in flipbook.pages] == [1]
+    assert [widget.type for widget in flipbook.pages[0].widgets] == ["link"]
+
+
+@pytest.mark.parametrize("relation", ["page.flipbook", "widget.page"])
+def test_editor_statement_raises_on_unloaded_relation(relation):
+    flipbook = asyncio.run(_load_editor_flipbook())
+    page = flipbook.pages[0]
+    objects = {"page": page, "widget": page.widgets[0]}
+
+    name, attribute = relation.split(".")
+    with pytest.raises(InvalidRequestError, match="lazy=.raise."):
+        getattr(objects[name], attribute)